@@ -1,17 +1,30 @@
 import os
 import sys
+import asyncio
 import yaml
-import aiofiles
+import shutil
+import time
+import threading
 import configparser
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query
-from git import Repo
+from fastapi.responses import ORJSONResponse
+from git import Repo, GitError
 from uuid import UUID
-from typing import Optional
+from types import MappingProxyType
+from typing import Mapping, Optional
+from functools import lru_cache
+from collections import OrderedDict
 from starlette.responses import FileResponse
 from fastapi.params import Path
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+    print('PyYAML built without libyaml, using pure-python loader', 'warning')
 
-app = FastAPI()
+
+app = FastAPI(default_response_class=ORJSONResponse)
 
 
 class Config:
@@ -27,13 +40,20 @@ class Config:
         self.config = configparser.ConfigParser()
         self.config.read(self.config_file)
 
+        # options never change after load, so resolve them all up front;
+        # values that fail interpolation are skipped, not fatal
+        self._options = {}
+        for section in self.config.sections():
+            for key in self.config.options(section):
+                try:
+                    self._options[(section, key)] = self.config.get(section, key)
+                except configparser.Error:
+                    continue
+
     def get(self, section, key):
         # get config option by section and key name
-        answer = None
-
-        try:
-            answer = self.config.get(section, key)
-        except:
+        answer = self._options.get((section, key))
+        if answer is None:
             print(f'config file missing option: {section} {key}', 'error')
 
         return answer
@@ -44,56 +64,285 @@ global REPO_HOME
 REPO_HOME = config.get('main', 'repo_path')
 
 
-def verify_dir_is_repo(repo_path: str) -> bool:
+@lru_cache(maxsize=256)
+def _resolve_repo(repo_name: str) -> str:
+    # canonical absolute path, refusing names that escape REPO_HOME
+    repo_home = os.path.realpath(REPO_HOME)
+    repo_path = os.path.realpath(os.path.join(repo_home, repo_name))
+    if not repo_path.startswith(repo_home + os.sep):
+        raise HTTPException(status_code=400, detail=f'invalid repository name: {repo_name}')
+    return repo_path
+
+
+# Repo handles for paths already confirmed to be git repositories
+_REPO_CACHE = {}
+_REPO_CACHE_LOCK = threading.Lock()
+
+
+def get_repo(repo_path: str) -> Optional[Repo]:
+    repo = _REPO_CACHE.get(repo_path)
+    if repo is not None:
+        # drop handles whose repository was deleted or moved away
+        if os.path.isdir(repo.git_dir):
+            return repo
+        with _REPO_CACHE_LOCK:
+            if _REPO_CACHE.get(repo_path) is repo:
+                del _REPO_CACHE[repo_path]
+
     try:
         repo = Repo(repo_path)
-        return True
-    except:
-        return False
+    except Exception:
+        return None
+
+    with _REPO_CACHE_LOCK:
+        return _REPO_CACHE.setdefault(repo_path, repo)
+
+
+def verify_dir_is_repo(repo_path: str) -> bool:
+    return get_repo(repo_path) is not None
+
+
+def _freeze(value):
+    # read-only view of parsed YAML so cached documents can be shared
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+# parsed prompts keyed by (path, mtime, size) so edits invalidate the entry
+_YAML_CACHE = OrderedDict()
+_YAML_CACHE_MAX = 512
+_YAML_CACHE_LOCK = threading.Lock()
+
+
+def parse_yaml(file_path: str) -> Mapping:
+    st = os.stat(file_path)
+    key = (file_path, st.st_mtime_ns, st.st_size)
 
+    with _YAML_CACHE_LOCK:
+        data = _YAML_CACHE.get(key)
+        if data is not None:
+            _YAML_CACHE.move_to_end(key)
+
+    if data is not None:
+        return data
 
-def parse_yaml(file_path: str) -> dict:
     with open(file_path, 'r') as f:
-        data = yaml.safe_load(f)
+        data = yaml.load(f, Loader=SafeLoader)
+
+    # a self-referencing alias such as `a: &a [*a]` has no frozen form
+    try:
+        data = _freeze(data)
+    except RecursionError as err:
+        raise yaml.YAMLError(f'recursive or too deeply nested document: {file_path}') from err
+
+    with _YAML_CACHE_LOCK:
+        _YAML_CACHE[key] = data
+        # never evict below the number of indexed prompts, or every
+        # index refresh would re-parse the whole repository
+        limit = max(_YAML_CACHE_MAX, sum(_INDEXED_FILES.values()))
+        if len(_YAML_CACHE) > limit:
+            _YAML_CACHE.popitem(last=False)
+
     return data
 
 
+# uuid -> path lookups, one entry per repository
+_REPO_INDEX = {}
+# how often indexed repositories are re-scanned in the background
+_INDEX_REFRESH_SECONDS = 5
+# number of prompts per indexed repository, used to size the YAML cache
+_INDEXED_FILES = {}
+
+
+def _iter_yml(repo_path: str):
+    # scandir walk that skips hidden directories such as .git entirely;
+    # unreadable directories are skipped like os.walk does
+    stack = [repo_path]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.'):
+                        stack.append(entry.path)
+                elif entry.name.endswith('.yml') and entry.is_file():
+                    yield entry
+
+
+def _repo_fingerprint(repo_path: str) -> frozenset:
+    # (path, mtime, size) of every prompt; changes whenever a prompt does
+    files = set()
+    for entry in _iter_yml(repo_path):
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        files.add((entry.path, st.st_mtime_ns, st.st_size))
+    return frozenset(files)
+
+
+def _build_repo_index(repo_path: str) -> dict:
+    uuid_map = {}
+    files = _repo_fingerprint(repo_path)
+    _INDEXED_FILES[repo_path] = len(files)
+
+    for file_path, _, _ in sorted(files):
+        # one unreadable prompt must not hide the rest of the repository
+        try:
+            data = parse_yaml(file_path)
+        except (yaml.YAMLError, OSError, ValueError, RecursionError) as err:
+            print(f'skipping {file_path} in index: {err}', 'error')
+            continue
+
+        if isinstance(data, Mapping) and isinstance(data.get('uuid'), str):
+            uuid_map.setdefault(data['uuid'], file_path)
+
+    index = {'uuid_map': uuid_map, 'files': files, 'built_at': time.monotonic()}
+    _REPO_INDEX[repo_path] = index
+    return index
+
+
+def _find_prompt_by_uuid(repo_path: str, prompt_uuid: str):
+    # index entries are checked on use; a miss or a stale hit rebuilds once,
+    # unless the index is younger than one refresh interval
+    index = _REPO_INDEX.get(repo_path)
+    rebuilt = index is None
+    if rebuilt:
+        index = _build_repo_index(repo_path)
+
+    while True:
+        file_location = index['uuid_map'].get(prompt_uuid)
+        if file_location:
+            # served from the parse cache unless the file changed on disk
+            try:
+                data = parse_yaml(file_location)
+            except (yaml.YAMLError, OSError, ValueError, RecursionError):
+                data = None
+
+            if isinstance(data, Mapping) and data.get('uuid') == prompt_uuid:
+                return file_location, data
+
+        if rebuilt or time.monotonic() - index['built_at'] < _INDEX_REFRESH_SECONDS:
+            return None, None
+
+        index = _build_repo_index(repo_path)
+        rebuilt = True
+
+
+async def _refresh_repo_indexes():
+    while True:
+        await asyncio.sleep(_INDEX_REFRESH_SECONDS)
+
+        with _REPO_CACHE_LOCK:
+            for repo_path, repo in list(_REPO_CACHE.items()):
+                if not os.path.isdir(repo.git_dir):
+                    del _REPO_CACHE[repo_path]
+
+        for repo_path in list(_REPO_INDEX):
+            if not os.path.isdir(repo_path):
+                _REPO_INDEX.pop(repo_path, None)
+                _INDEXED_FILES.pop(repo_path, None)
+                continue
+
+            # only rebuild when a prompt was added, removed or modified
+            files = None
+            try:
+                files = await asyncio.to_thread(_repo_fingerprint, repo_path)
+                if files != _REPO_INDEX.get(repo_path, {}).get('files'):
+                    await asyncio.to_thread(_build_repo_index, repo_path)
+            except Exception as err:
+                print(f'failed to refresh index for {repo_path}: {err}', 'error')
+                # keep the previous index but remember this fingerprint, so
+                # the same failure is not retried and logged every pass
+                index = _REPO_INDEX.get(repo_path)
+                if index is not None and files is not None:
+                    _REPO_INDEX[repo_path] = {**index, 'files': files}
+
+
+_refresh_task = None
+
+
+@app.on_event('startup')
+async def start_index_refresh():
+    # keep a reference so the task is not garbage collected
+    global _refresh_task
+    _refresh_task = asyncio.create_task(_refresh_repo_indexes())
+
+
+@app.on_event('shutdown')
+async def stop_index_refresh():
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+
+
+# git writes the index file on every commit, so commits run one at a time
+_COMMIT_LOCK = threading.Lock()
+
+
+def _save_upload(src, file_path: str):
+    with open(file_path, 'wb') as f:
+        shutil.copyfileobj(src, f, length=1 << 20)
+
+
+def _commit_file(repo: Repo, file_path: str):
+    with _COMMIT_LOCK:
+        repo.git.add([file_path])
+        repo.index.commit('Add file through API')
+
+
 @app.post('/{repo_name}')
 async def upload_file(repo_name: str, file: UploadFile = File(...)):
+    repo_path = _resolve_repo(repo_name)
+    repo = await asyncio.to_thread(get_repo, repo_path)
+    if repo is None:
+        raise HTTPException(status_code=400, detail=f'directory is not a git repository: {repo_path}')
+
+    # the upload must land inside the work tree, never in .git or outside it
+    file_path = os.path.realpath(os.path.join(repo_path, file.filename or ''))
+    if (not file_path.startswith(repo_path + os.sep)
+            or os.path.relpath(file_path, repo_path).split(os.sep)[0] == '.git'):
+        raise HTTPException(status_code=400, detail=f'invalid file name: {file.filename}')
+
+    # only a bad file name is the client's fault; details of server-side
+    # failures are logged here and not sent back
     try:
-        repo_path = os.path.join(REPO_HOME, repo_name)
-        if not verify_dir_is_repo(repo_path):
-            raise HTTPException(status_code=400, detail=f'directory is not a git repository: {repo_path}')
+        await asyncio.to_thread(_save_upload, file.file, file_path)
+    except (IsADirectoryError, NotADirectoryError, FileNotFoundError, ValueError) as err:
+        raise HTTPException(status_code=400, detail=f'invalid file name: {file.filename}') from err
+    except OSError as err:
+        print(f'failed to store {file_path}: {err}', 'error')
+        raise HTTPException(status_code=500, detail='failed to store uploaded file') from err
 
-        file_path = os.path.join(repo_path, file.filename)
-        
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
+    try:
+        await asyncio.to_thread(_commit_file, repo, file_path)
+    except (GitError, OSError, ValueError) as err:
+        print(f'failed to commit {file_path}: {err}', 'error')
+        raise HTTPException(status_code=500, detail='failed to commit uploaded file') from err
 
-        repo = Repo(repo_path)
-        repo.git.add([file_path])
-        repo.index.commit('Add file through API')
-        msg = {'filename': file.filename, 'message': 'file uploaded and committed successfully'}
-        
-        return msg
+    msg = {'filename': file.filename, 'message': 'file uploaded and committed successfully'}
     
-    except Exception as err:
-        raise HTTPException(status_code=400, detail=str(err))
+    return msg
 
 
 @app.get('/{repo_name}/_name/{prompt_name}', responses={200: {'content': {'application/x-yaml': {}}}})
 async def read_file_by_name(repo_name: str, prompt_name: str, raw: Optional[bool] = Query(None)):
-    repo_path = os.path.join(REPO_HOME, repo_name)
-    if not verify_dir_is_repo(repo_path):
+    repo_path = _resolve_repo(repo_name)
+    if not await asyncio.to_thread(verify_dir_is_repo, repo_path):
         raise HTTPException(status_code=400, detail=f'directory is not a git repository: {repo_path}')
 
     file_path = os.path.join(repo_path, f'{prompt_name}.yml')
     
-    if os.path.exists(file_path):
-        data = parse_yaml(file_path)
-        
+    if await asyncio.to_thread(os.path.isfile, file_path):
+        # only the raw view needs the parsed document
         if raw:
+            data = await asyncio.to_thread(parse_yaml, file_path)
             return {'prompt': data.get('prompt')}
         else:
             return FileResponse(file_path, media_type='application/x-yaml')
@@ -104,20 +353,15 @@ async def read_file_by_name(repo_name: str, prompt_name: str, raw: Optional[bool
 
 @app.get('/{repo_name}/_uuid/{prompt_uuid}', responses={200: {'content': {'application/x-yaml': {}}}})
 async def read_file_by_uuid(repo_name: str, prompt_uuid: UUID, raw: Optional[bool] = Query(None)):
-    repo_path = os.path.join(REPO_HOME, repo_name)
-    if not verify_dir_is_repo(repo_path):
+    repo_path = _resolve_repo(repo_name)
+    if not await asyncio.to_thread(verify_dir_is_repo, repo_path):
         raise HTTPException(status_code=400, detail=f'directory is not a git repository: {repo_path}')
 
-    for root, _, files in os.walk(repo_path):
-        for file in files:
-            if file.endswith('.yml'):
-                file_location = os.path.join(root, file)
-                data = parse_yaml(file_location)
-                
-                if data.get('uuid') == str(prompt_uuid):
-                    if raw:
-                        return {'prompt': data.get('prompt')}
-                    else:
-                        return FileResponse(file_location, media_type='application/x-yaml')
-    
-    raise HTTPException(status_code=404, detail=f'File not found for UUID: {prompt_uuid}')
\ No newline at end of file
+    file_location, data = await asyncio.to_thread(_find_prompt_by_uuid, repo_path, str(prompt_uuid))
+    if file_location is None:
+        raise HTTPException(status_code=404, detail=f'File not found for UUID: {prompt_uuid}')
+
+    if raw:
+        return {'prompt': data.get('prompt')}
+    else:
+        return FileResponse(file_location, media_type='application/x-yaml')
\ No newline at end of file
@@ -7,14 +7,17 @@ import argparse
 import configparser
 import json
 import yaml
-import pandas as pd
 
 from rich import print as rprint
 from rich.prompt import Prompt
 from git import Repo
 from collections import defaultdict 
 from pykwalify.core import Core
-from langchain import PromptTemplate
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 
 statistics = defaultdict(lambda: defaultdict(int))
@@ -63,11 +66,14 @@ def init_repo(config):
 
 
 def convert_to_langchain(fpath):
+    # langchain is slow to import and only needed for this command
+    from langchain import PromptTemplate
+
     rprint(f'[bold green](status)[/bold green] converting template {fpath}')
     
     with open(fpath, 'r') as fp:
         try:
-            data = yaml.safe_load(fp)
+            data = yaml.load(fp, Loader=SafeLoader)
             prompt = data['prompt']
             
             # check if prompt-serve template contains input variables
@@ -152,7 +158,7 @@ def save_prompt(prompt, filename):
 def collect_stats_from_file(file_path):
     with open(file_path, 'r') as file:
         try:
-            data = yaml.safe_load(file)
+            data = yaml.load(file, Loader=SafeLoader)
 
             if 'category' in data:
                 statistics['category'][data['category']] += 1
@@ -176,6 +182,8 @@ def collect_stats_from_dir(dir_path):
 
 
 def display_stats():
+    import pandas as pd
+
     # convert dictionary to dataframe
     df = pd.DataFrame.from_dict({(i,j): statistics[i][j] 
                             for i in statistics.keys() 
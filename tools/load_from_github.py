@@ -10,10 +10,17 @@ import yaml
 import argparse
 import requests
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 class PromptLoader:    
     def __init__(self):
         self.base_url = 'https://raw.githubusercontent.com'
+        # reuse one keep-alive connection across get_template calls
+        self.session = requests.Session()
 
 
     def get_template(self, full_repo_name, full_prompt_name) -> str:
@@ -32,12 +39,12 @@ class PromptLoader:
         print(f'(status) retrieving template: {url}')
     
         try:
-            response = requests.get(url)
+            response = self.session.get(url)
             if response.status_code != 200:
                 print(f'(error) error retrieving template - non 200 status code: {response.status_code}')
                 return prompt_data
     
-            prompt_data = yaml.safe_load(response.text)
+            prompt_data = yaml.load(response.text, Loader=SafeLoader)
 
         except Exception as err:
             print(f'(error) error retrieving template - exception: {err}')
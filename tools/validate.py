@@ -7,12 +7,16 @@ import sys
 import uuid
 import argparse
 import yaml
-import pandas as pd
 
 from rich import print as rprint
 from collections import defaultdict
 from pykwalify.core import Core
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 
 # store uuids in a set to check for uniqueness
 seen_uuids = set()
@@ -21,30 +25,23 @@ passed = 0
 failed = 0
 
 
-def collect_stats_from_file(file_path):
-    with open(file_path, 'r') as file:
-        try:
-            data = yaml.safe_load(file)
-
-            if 'category' in data:
-                statistics['category'][data['category']] += 1
-            if 'provider' in data:
-                statistics['provider'][data['provider']] += 1
-            if 'model' in data:
-                statistics['model'][data['model']] += 1
-
-            for tag in data.get('tags', []):
-                statistics['tags'][tag] += 1
+def collect_stats(data):
+    if 'category' in data:
+        statistics['category'][data['category']] += 1
+    if 'provider' in data:
+        statistics['provider'][data['provider']] += 1
+    if 'model' in data:
+        statistics['model'][data['model']] += 1
 
-        except yaml.YAMLError as err:
-            rprint(f'[bold red](error)[/bold red] error getting stats from {file_path}: {err}')
+    for tag in data.get('tags', []):
+        statistics['tags'][tag] += 1
 
 
 def validate_file(file_path, create=False):
     global passed, failed
     # load the yaml file
     with open(file_path, 'r') as f:
-        data = yaml.safe_load(f)
+        data = yaml.load(f, Loader=SafeLoader)
 
     # check for uniqueness of uuid
     f_uuid = data.get('uuid')
@@ -60,7 +57,7 @@ def validate_file(file_path, create=False):
     seen_uuids.add(f_uuid)
 
     # validate against the schema
-    c = Core(source_data=data, schema_files=[SCHEMA_PATH])
+    c = Core(source_data=data, schema_data=SCHEMA_DATA)
 
     try:
         c.validate()
@@ -70,6 +67,8 @@ def validate_file(file_path, create=False):
         rprint(f'[bold red](error)[/bold red] {file_path} is invalid: {str(e)}')
         failed += 1
 
+    return data
+
 
 def validate_directory(directory_path, create=False, stats=False):
     # walk the directory and validate each file
@@ -79,13 +78,17 @@ def validate_directory(directory_path, create=False, stats=False):
             # only validate yaml files
             if file.endswith('.yaml') or file.endswith('.yml'):
                 file_path = os.path.join(root, file)
-                validate_file(file_path, create)
+                data = validate_file(file_path, create)
                 
+                # reuse the parsed prompt rather than loading it again
                 if stats:
-                    collect_stats_from_file(file_path)
+                    collect_stats(data)
 
 
 def display_stats():
+    # pandas is only needed with --gen-stats
+    import pandas as pd
+
     # convert dictionary to dataframe
     df = pd.DataFrame.from_dict({(i,j): statistics[i][j] 
                             for i in statistics.keys() 
@@ -149,7 +152,10 @@ if __name__ == '__main__':
         rprint(f'[bold red](error)[/bold red] schema file {args.schema} does not exist.')
         sys.exit(1)
 
-    SCHEMA_PATH = args.schema
+    # parse the schema once instead of once per validated file
+    with open(args.schema, 'r') as f:
+        SCHEMA_DATA = yaml.load(f, Loader=SafeLoader)
+
     CREATE = args.create
     STATS = args.gen_stats
 